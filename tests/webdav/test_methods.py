@@ -1 +1,282 @@
 __author__ = 'designerror'
+
+import os
+import threading
+import time
+from io import BytesIO
+
+import pytest
+
+from webdav.client import Client
+from webdav.exceptions import OptionNotValid
+
+wsgidav_app = pytest.importorskip("wsgidav.wsgidav_app")
+cheroot_wsgi = pytest.importorskip("cheroot.wsgi")
+
+finite_depth = b'<?xml version="1.0" encoding="utf-8"?>\n<D:error xmlns:D="DAV:"><D:propfind-finite-depth/></D:error>'
+
+
+def limit_depth(app, mode):
+
+    def middleware(environ, start_response):
+        infinite = environ.get('HTTP_DEPTH', 'infinity').lower() == 'infinity'
+        if environ['REQUEST_METHOD'] == 'PROPFIND' and infinite:
+            if mode == 'refused':
+                start_response('403 Forbidden', [('Content-Type', 'application/xml'), ('Content-Length', str(len(finite_depth)))])
+                return [finite_depth]
+            if mode == 'downgraded':
+                environ['HTTP_DEPTH'] = '1'
+        return app(environ, start_response)
+
+    return middleware
+
+
+@pytest.fixture(params=['infinity', 'refused', 'downgraded'])
+def client(request, tmpdir):
+
+    config = {
+        'provider_mapping': {'/': str(tmpdir.mkdir('server'))},
+        'simple_dc': {'user_mapping': {'*': {'login': {'password': 'password'}}}},
+        'http_authenticator': {'accept_basic': True, 'accept_digest': False, 'default_to_digest': False},
+        'logging': {'enable': False},
+        'property_manager': True,
+        'verbose': 0
+    }
+    app = limit_depth(wsgidav_app.WsgiDAVApp(config), request.param)
+
+    server = cheroot_wsgi.Server(('127.0.0.1', 0), app)
+    server.prepare()
+    threading.Thread(target=server.serve, daemon=True).start()
+
+    client = Client({
+        'webdav_hostname': "http://127.0.0.1:{port}".format(port=server.bind_addr[1]),
+        'webdav_login': "login",
+        'webdav_password': "password"
+    })
+    yield client
+    client.close()
+    server.stop()
+
+
+def write(path, data, modified=None):
+
+    with open(path, 'w') as local_file:
+        local_file.write(data)
+    if modified is not None:
+        os.utime(path, (modified, modified))
+
+
+def read(path):
+
+    with open(path) as local_file:
+        return local_file.read()
+
+
+class TestSync:
+
+    def test_sync_keeps_newer_remote_files(self, client, tmpdir):
+
+        remote = tmpdir.mkdir('remote')
+        write(str(remote.join('f1.txt')), 'remote and newer')
+        write(str(remote.join('same_size_remote.txt')), 'remote')
+        write(str(remote.join('same_size_local.txt')), 'remote')
+        remote.mkdir('sub').mkdir('deep')
+        write(str(remote.join('sub', 'deep', 'f2.txt')), 'deep')
+        client.upload('up/', str(remote))
+
+        local = tmpdir.mkdir('local')
+        write(str(local.join('f1.txt')), 'stale', modified=0)
+        write(str(local.join('only_local.txt')), 'local')
+        write(str(local.join('same_size_remote.txt')), 'stale!', modified=0)
+        write(str(local.join('same_size_local.txt')), 'local!', modified=time.time() + 3600)
+
+        client.sync('up/', str(local))
+
+        assert read(str(local.join('f1.txt'))) == 'remote and newer'
+        assert read(str(local.join('sub', 'deep', 'f2.txt'))) == 'deep'
+        assert read(str(local.join('same_size_remote.txt'))) == 'remote'
+        assert sorted(client.list('up/')) == ['f1.txt', 'only_local.txt', 'same_size_local.txt', 'same_size_remote.txt', 'sub/']
+        assert client.diff('up/', str(local)) == ([], [])
+
+        downloaded = str(tmpdir.join('downloaded'))
+        client.download('up/', downloaded)
+        assert read(os.path.join(downloaded, 'f1.txt')) == 'remote and newer'
+        assert read(os.path.join(downloaded, 'only_local.txt')) == 'local'
+        assert read(os.path.join(downloaded, 'same_size_local.txt')) == 'local!'
+        assert read(os.path.join(downloaded, 'sub', 'deep', 'f2.txt')) == 'deep'
+
+    def test_list_tree_is_complete(self, client, tmpdir):
+
+        remote = tmpdir.mkdir('remote')
+        remote.mkdir('a').mkdir('b')
+        write(str(remote.join('a', 'b', 'f.txt')), 'f')
+        client.upload('up/', str(remote))
+
+        tree = client.list_tree('up/')
+
+        assert tree == {'/up/': ['a/'], '/up/a/': ['b/'], '/up/a/b/': ['f.txt']}
+        assert client.list('up/a/b/') == ['f.txt']
+
+
+class TestProgress:
+
+    def test_directory_progress_covers_whole_batch(self, client, tmpdir):
+
+        remote = tmpdir.mkdir('remote')
+        remote.mkdir('sub')
+        sizes = {'a.txt': 1000, 'b.txt': 20000, os.path.join('sub', 'c.txt'): 300000}
+        for (name, size) in sizes.items():
+            write(str(remote.join(name)), 'x' * size)
+        total = sum(sizes.values())
+
+        uploads = list()
+        client.upload('up/', str(remote), progress=lambda *values: uploads.append(values[2:]))
+        downloads = list()
+        client.download('up/', str(tmpdir.join('downloaded')), progress=lambda *values: downloads.append(values[:2]))
+
+        for calls in (uploads, downloads):
+            assert {values[0] for values in calls} == {total}
+            done = [values[1] for values in calls]
+            assert done == sorted(done)
+            assert done[-1] == total
+
+
+class TestCheck:
+
+    def test_check_keeps_pooled_connections_usable(self, client):
+
+        client.cache_ttl = 0
+        client.mkdir('d/')
+
+        for _ in range(50):
+            assert not client.check('missing')
+            assert client.list('d/') == []
+
+        assert client.check('d/')
+
+
+class TestProperty:
+
+    def test_property_values_and_names_are_escaped(self, client):
+
+        client.upload_from(BytesIO(b'f'), 'f.txt')
+        option = {'namespace': 'urn:test&"<', 'name': 'note', 'value': '</note><injected/> & "more"'}
+
+        with pytest.raises(OptionNotValid):
+            client.set_property('f.txt', option)
+
+        option['namespace'] = 'urn:test'
+        client.set_property('f.txt', option)
+
+        assert client.get_property('f.txt', option) == option['value']
+        batch = client.get_property_batch('f.txt', [option])
+        assert batch['/f.txt'] == {'note': option['value']}
+
+        with pytest.raises(OptionNotValid):
+            client.get_property('f.txt', {'namespace': 'urn:test', 'name': 'note/><x'})
+
+    def test_resource_properties(self, client):
+
+        client.upload_from(BytesIO(b'data'), 'f.txt')
+        resource = client.resource('f.txt')
+
+        assert resource.check()
+        assert resource.properties([{'namespace': 'DAV:', 'name': 'getcontentlength'}]) == {'getcontentlength': '4'}
+
+
+def other_client(client):
+
+    return Client({
+        'webdav_hostname': client.webdav.hostname,
+        'webdav_login': "login",
+        'webdav_password': "password"
+    })
+
+
+class TestCache:
+
+    def test_list_shows_own_changes(self, client, tmpdir):
+
+        client.mkdir('d/')
+        assert client.list('d/') == []
+
+        client.mkdir('d/sub/')
+        assert client.list('d/') == ['sub/']
+
+        client.upload_from(BytesIO(b'from'), 'd/from.txt')
+        local_path = str(tmpdir.join('local.txt'))
+        write(local_path, 'local')
+        client.upload('d/local.txt', local_path)
+        assert sorted(client.list('d/')) == ['from.txt', 'local.txt', 'sub/']
+        assert client.check('d/local.txt')
+
+        client.copy('d/from.txt', 'd/sub/copy.txt')
+        assert client.list('d/sub/') == ['copy.txt']
+
+        client.move('d/sub/copy.txt', 'd/moved.txt')
+        assert client.list('d/sub/') == []
+        assert sorted(client.list('d/')) == ['from.txt', 'local.txt', 'moved.txt', 'sub/']
+        assert not client.check('d/sub/copy.txt')
+
+        client.clean('d/moved.txt')
+        assert sorted(client.list('d/')) == ['from.txt', 'local.txt', 'sub/']
+        assert not client.check('d/moved.txt')
+
+    def test_forget_root_drops_descendants(self, client):
+
+        client.mkdir('d/')
+        client.mkdir('d/sub/')
+        client.upload_from(BytesIO(b'old'), 'd/sub/old.txt')
+        assert client.list('d/sub/') == ['old.txt']
+        assert client.check('d/sub/old.txt')
+
+        other = other_client(client)
+        other.clean('d/sub/old.txt')
+        other.upload_from(BytesIO(b'new'), 'd/sub/new.txt')
+        other.close()
+        assert client.list('d/sub/') == ['old.txt']
+
+        client.forget('/')
+        assert not client.cache
+        assert client.list('d/sub/') == ['new.txt']
+        assert not client.check('d/sub/old.txt')
+
+    def test_zero_ttl_disables_caching(self, client):
+
+        client.cache_ttl = 0
+        client.mkdir('d/')
+        assert client.list('d/') == []
+        assert not client.check('d/f.txt')
+
+        other = other_client(client)
+        other.upload_from(BytesIO(b'f'), 'd/f.txt')
+        other.close()
+
+        assert client.list('d/') == ['f.txt']
+        assert client.check('d/f.txt')
+        assert not client.cache
+
+    def test_list_tree_caches_complete_listings(self, client, tmpdir):
+
+        remote = tmpdir.mkdir('remote')
+        remote.mkdir('a').mkdir('b')
+        remote.mkdir('empty')
+        write(str(remote.join('a', 'f.txt')), 'f')
+        client.upload('up/', str(remote))
+        client.forget('/')
+
+        client.list_tree('up/')
+
+        other = other_client(client)
+        other.upload_from(BytesIO(b'g'), 'up/a/b/g.txt')
+        other.close()
+
+        assert sorted(client.list('up/')) == ['a/', 'empty/']
+        assert sorted(client.list('up/a/')) == ['b/', 'f.txt']
+        assert client.list('up/a/b/') == []
+        assert client.list('up/empty/') == []
+
+        client.clean('up/a/f.txt')
+        assert client.list('up/a/') == ['b/']
+        client.forget('up/a/b/')
+        assert client.list('up/a/b/') == ['g.txt']
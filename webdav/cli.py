@@ -1,7 +1,5 @@
-#!/usr/bin/python
 # PYTHON_ARGCOMPLETE_OK
 
-from __future__ import print_function
 import sys
 import os
 import shlex
@@ -10,9 +8,8 @@ import platform
 import subprocess
 import getpass
 import argparse
-import argcomplete
+import logging
 from webdav.client import Client, WebDavException, NotConnection, Urn
-from distutils.util import strtobool
 from base64 import b64decode, b64encode
 
 
@@ -84,10 +81,10 @@ class ProgressBar:
     def __init__(self):
         self.precise = 0
         self.total = 0
+        self.width = None
 
     def show(self):
         progress_line = self._progress_line()
-        import sys
         if self.precise == 100:
             print(progress_line, end="")
         else:
@@ -95,8 +92,9 @@ class ProgressBar:
             sys.stdout.write("\r")
 
     def _progress_line(self):
-        sizex, sizey = get_terminal_size()
-        available_width = sizex
+        if self.width is None:
+            self.width, _ = get_terminal_size()
+        available_width = self.width
         precise = self._get_field_precise()
         ratio = self._get_field_ratio()
         available_width -= len(precise) + len(ratio)
@@ -145,6 +143,16 @@ setting_keys = ['webdav_hostname', 'webdav_root', 'webdav_login', 'webdav_passwo
 crypto_keys = ['webdav_password', 'webdav_token', 'proxy_password']
 
 
+def strtobool(value):
+
+    value = value.lower()
+    if value in ("y", "yes", "t", "true", "on", "1"):
+        return True
+    if value in ("n", "no", "f", "false", "off", "0"):
+        return False
+    raise ValueError(value)
+
+
 def encoding(source):
 
     if not source:
@@ -230,8 +238,11 @@ class Formatter(argparse.RawTextHelpFormatter):
         return format
 
 
+log = logging.getLogger("webdav")
+
+
 def logging_exception(exception):
-    print(exception)
+    log.error("%s", exception, exc_info=log.isEnabledFor(logging.DEBUG))
 
 
 def urn_completer(prefix, **kwargs):
@@ -253,7 +264,128 @@ def urn_completer(prefix, **kwargs):
 
     return tuple()
 
-if __name__ == "__main__":
+
+def check_command(client, args):
+
+    check = client.check(args.path) if args.path else client.check()
+    text = "success" if check else "not success"
+    print(text)
+
+
+def free_command(client, args):
+
+    free_size = client.free()
+    print(free_size)
+
+
+def ls_command(client, args):
+
+    paths = client.list(args.path) if args.path else client.list()
+    for path in paths:
+        print(path)
+
+
+def clean_command(client, args):
+    client.clean(args.path)
+
+
+def mkdir_command(client, args):
+    client.mkdir(args.path)
+
+
+def copy_command(client, args):
+    client.copy(remote_path_from=args.path, remote_path_to=args.to_path)
+
+
+def move_command(client, args):
+    client.move(remote_path_from=args.path, remote_path_to=args.to_path)
+
+
+def download_command(client, args):
+
+    progress_bar = ProgressBar()
+
+    def download_progress(download_t, download_d, upload_t, upload_d):
+        progress_bar.callback(current=download_d, total=download_t)
+
+    if not os.path.exists(path=args.to_path):
+        client.download(remote_path=args.path, local_path=args.to_path, progress=download_progress)
+        print("\n")
+    else:
+        choice = input("Local path exists, do you want to overwrite it? [Y/n] ")
+        try:
+            yes = strtobool(choice.lower())
+            if yes:
+                client.download(remote_path=args.path, local_path=args.to_path, progress=download_progress)
+                print("\n")
+        except ValueError:
+            print("Incorrect answer")
+
+
+def upload_command(client, args):
+
+    progress_bar = ProgressBar()
+
+    def upload_progress(download_t, download_d, upload_t, upload_d):
+        progress_bar.callback(current=upload_d, total=upload_t)
+
+    if not client.check(remote_path=args.path):
+        client.upload(remote_path=args.path, local_path=args.from_path, progress=upload_progress)
+        print("\n")
+    else:
+        choice = input("Remote resource exists, do you want to overwrite it? [Y/n] ")
+        try:
+            yes = strtobool(choice.lower())
+            if yes:
+                client.upload(remote_path=args.path, local_path=args.from_path, progress=upload_progress)
+                print("\n")
+        except ValueError:
+            print("Incorrect answer")
+
+
+def publish_command(client, args):
+
+    link = client.publish(args.path)
+    print(link)
+
+
+def unpublish_command(client, args):
+    client.unpublish(args.path)
+
+
+def push_command(client, args):
+    client.push(remote_directory=args.path, local_directory=args.from_path)
+
+
+def pull_command(client, args):
+    client.pull(remote_directory=args.path, local_directory=args.to_path)
+
+
+def info_command(client, args):
+
+    info = client.info(args.path)
+    print(info)
+
+
+commands = {
+    'check': (check_command, ()),
+    'free': (free_command, ()),
+    'ls': (ls_command, ()),
+    'clean': (clean_command, ('path',)),
+    'mkdir': (mkdir_command, ('path',)),
+    'copy': (copy_command, ('path', 'to_path')),
+    'move': (move_command, ('path', 'to_path')),
+    'download': (download_command, ('path', 'to_path')),
+    'upload': (upload_command, ('path', 'from_path')),
+    'publish': (publish_command, ('path',)),
+    'unpublish': (unpublish_command, ('path',)),
+    'push': (push_command, ('path', 'from_path')),
+    'pull': (pull_command, ('path', 'to_path')),
+    'info': (info_command, ('path',))
+}
+
+
+def main():
 
     epilog = """
     Examples:
@@ -315,35 +447,35 @@ if __name__ == "__main__":
     parser.add_argument("-f", '--from-path', help="example: ~/Documents/file1")
     parser.add_argument("-t", "--to-path", help="example for download and pull: ~/Download/file1\nexample for copy and move: dir1/dir2").completer = urn_completer
 
-    argcomplete.autocomplete(parser, exclude=("-h", "--help", "--proxy", "-p", "-r", "--root", "-c", "--cert-path", "-t", "--to-path", "-v", "--version", "-f", "--from-path", "-k", "--key-path"))
+    if "_ARGCOMPLETE" in os.environ:
+        try:
+            import argcomplete
+        except ImportError:
+            pass
+        else:
+            argcomplete.autocomplete(parser, exclude=("-h", "--help", "--proxy", "-p", "-r", "--root", "-c", "--cert-path", "-t", "--to-path", "-v", "--version", "-f", "--from-path", "-k", "--key-path"))
+
     args = parser.parse_args()
     action = args.action
 
+    logging.basicConfig(format="%(message)s")
+
     if action == 'login':
         env = dict()
         if not args.path:
-            try:
-                env['webdav_hostname'] = raw_input("webdav_hostname: ")
-            except NameError:
-                env['webdav_hostname'] = input("webdav_hostname: ")
+            env['webdav_hostname'] = input("webdav_hostname: ")
         else:
             env['webdav_hostname'] = args.path
 
         if not args.token:
-            try:
-                env['webdav_login'] = raw_input("webdav_login: ")
-            except NameError:
-                env['webdav_login'] = input("webdav_login: ")
+            env['webdav_login'] = input("webdav_login: ")
             env['webdav_password'] = getpass.getpass("webdav_password: ")
         else:
             env['webdav_token'] = args.token
 
         if args.proxy:
             env['proxy_hostname'] = args.proxy
-            try:
-                env['proxy_login'] = raw_input("proxy_login: ")
-            except NameError:
-                env['proxy_login'] = input("proxy_login: ")
+            env['proxy_login'] = input("proxy_login: ")
             env['proxy_password'] = getpass.getpass("proxy_password: ")
 
         if args.root:
@@ -382,240 +514,23 @@ if __name__ == "__main__":
             print("First log on webdav server using the following command: wdc login.")
             sys.exit()
 
-        elif action == "logout":
+        if action == "logout":
             os.system("exit")
+            return
 
-        elif action == 'check':
-            options = import_options()
-            try:
-                client = Client(options)
-                connection = client.check()
-                if not connection:
-                    raise NotConnection(options["webdav_hostname"])
-                check = client.check(args.path) if args.path else client.check()
-                text = "success" if check else "not success"
-                print(text)
-            except WebDavException as e:
-                logging_exception(e)
-
-        elif action == 'free':
-            options = import_options()
-            try:
-                client = Client(options)
-                connection = client.check()
-                if not connection:
-                    raise NotConnection(options["webdav_hostname"])
-                free_size = client.free()
-                print(free_size)
-            except WebDavException as e:
-                logging_exception(e)
-
-        elif action == 'ls':
-            options = import_options()
-            try:
-                client = Client(options)
-                connection = client.check()
-                if not connection:
-                    raise NotConnection(options["webdav_hostname"])
-                paths = client.list(args.path) if args.path else client.list()
-                for path in paths:
-                    print(path)
-            except WebDavException as e:
-                logging_exception(e)
-
-        elif action == 'clean':
-            if not args.path:
-                parser.print_help()
-            else:
-                options = import_options()
-                try:
-                    client = Client(options)
-                    connection = client.check()
-                    if not connection:
-                        raise NotConnection(options["webdav_hostname"])
-                    client.clean(args.path)
-                except WebDavException as e:
-                    logging_exception(e)
-
-        elif action == 'mkdir':
-            if not args.path:
-                parser.print_help()
-            else:
-                options = import_options()
-                try:
-                    client = Client(options)
-                    connection = client.check()
-                    if not connection:
-                        raise NotConnection(options["webdav_hostname"])
-                    client.mkdir(args.path)
-                except WebDavException as e:
-                    logging_exception(e)
-
-        elif action == 'copy':
-            if not args.path or not args.to_path:
-                parser.print_help()
-            else:
-                options = import_options()
-                try:
-                    client = Client(options)
-                    connection = client.check()
-                    if not connection:
-                        raise NotConnection(options["webdav_hostname"])
-                    client.copy(remote_path_from=args.path, remote_path_to=args.to_path)
-                except WebDavException as e:
-                    logging_exception(e)
-
-        elif action == 'move':
-            if not args.path or not args.to_path:
-                parser.print_help()
-            else:
-                options = import_options()
-                try:
-                    client = Client(options)
-                    connection = client.check()
-                    if not connection:
-                        raise NotConnection(options["webdav_hostname"])
-                    client.move(remote_path_from=args.path, remote_path_to=args.to_path)
-                except WebDavException as e:
-                    logging_exception(e)
-
-        elif action == 'download':
-            if not args.path or not args.to_path:
-                parser.print_help()
-            else:
-                options = import_options()
-                progress_bar = ProgressBar()
-
-                def download_progress(download_t, download_d, upload_t, upload_d):
-                    progress_bar.callback(current=download_d, total=download_t)
-
-                try:
-                    client = Client(options)
-                    connection = client.check()
-                    if not connection:
-                        raise NotConnection(options["webdav_hostname"])
-                    if not os.path.exists(path=args.to_path):
-                        client.download(remote_path=args.path, local_path=args.to_path, progress=download_progress)
-                        print("\n")
-                    else:
-                        try:
-                            choice = raw_input("Local path exists, do you want to overwrite it? [Y/n] ")
-                        except NameError:
-                            choice = input("Local path exists, do you want to overwrite it? [Y/n] ")
-                        try:
-                            yes = strtobool(choice.lower())
-                            if yes:
-                                client.download(remote_path=args.path, local_path=args.to_path, progress=download_progress)
-                                print("\n")
-                        except ValueError:
-                            print("Incorrect answer")
-                except WebDavException as e:
-                    logging_exception(e)
-
-        elif action == 'upload':
-            if not args.path or not args.from_path:
-                parser.print_help()
-            else:
-                options = import_options()
-                progress_bar = ProgressBar()
-
-                def upload_progress(download_t, download_d, upload_t, upload_d):
-                    progress_bar.callback(current=upload_d, total=upload_t)
-
-                try:
-                    client = Client(options)
-                    connection = client.check()
-                    if not connection:
-                        raise NotConnection(options["webdav_hostname"])
-                    if not client.check(remote_path=args.path):
-                        client.upload(remote_path=args.path, local_path=args.from_path, progress=upload_progress)
-                        print("\n")
-                    else:
-                        try:
-                            choice = raw_input("Remote resource exists, do you want to overwrite it? [Y/n] ")
-                        except NameError:
-                            choice = input("Remote resource exists, do you want to overwrite it? [Y/n] ")
-                        try:
-                            yes = strtobool(choice.lower())
-                            if yes:
-                                client.upload(remote_path=args.path, local_path=args.from_path, progress=upload_progress)
-                                print("\n")
-                        except ValueError:
-                            print("Incorrect answer")
-                except WebDavException as e:
-                    logging_exception(e)
-
-        elif action == 'publish':
-            if not args.path:
-                parser.print_help()
-            else:
-                options = import_options()
-                try:
-                    client = Client(options)
-                    connection = client.check()
-                    if not connection:
-                        raise NotConnection(options["webdav_hostname"])
-                    link = client.publish(args.path)
-                    print(link)
-                except WebDavException as e:
-                    logging_exception(e)
-
-        elif action == 'unpublish':
-            if not args.path:
-                parser.print_help()
-            else:
-                options = import_options()
-                try:
-                    client = Client(options)
-                    connection = client.check()
-                    if not connection:
-                        raise NotConnection(options["webdav_hostname"])
-                    client.unpublish(args.path)
-                except WebDavException as e:
-                    logging_exception(e)
-
-        elif action == 'push':
-            if not args.path or not args.from_path:
-                parser.print_help()
-            else:
-                options = import_options()
-                try:
-                    client = Client(options)
-                    connection = client.check()
-                    if not connection:
-                        raise NotConnection(options["webdav_hostname"])
-                    client.push(remote_directory=args.path, local_directory=args.from_path)
-                except WebDavException as e:
-                    logging_exception(e)
-
-        elif action == 'pull':
-            if not args.path or not args.to_path:
-                parser.print_help()
-            else:
-                options = import_options()
-                try:
-                    client = Client(options)
-                    connection = client.check()
-                    if not connection:
-                        raise NotConnection(options["webdav_hostname"])
-                    client.pull(remote_directory=args.path, local_directory=args.to_path)
-                except WebDavException as e:
-                    logging_exception(e)
-
-        elif action == 'info':
-            if not args.path:
-                parser.print_help()
-            else:
-                options = import_options()
-                try:
-                    client = Client(options)
-                    connection = client.check()
-                    if not connection:
-                        raise NotConnection(options["webdav_hostname"])
-                    info = client.info(args.path)
-                    print(info)
-                except WebDavException as e:
-                    logging_exception(e)
-
-        else:
+        command, required = commands[action]
+        if not all(getattr(args, name) for name in required):
             parser.print_help()
+            return
+
+        try:
+            client = Client(options)
+            connection = client.check()
+            if not connection:
+                raise NotConnection(options["webdav_hostname"])
+            command(client, args)
+        except WebDavException as e:
+            logging_exception(e)
+
+if __name__ == "__main__":
+    main()
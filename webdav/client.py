@@ -4,42 +4,74 @@ import pycurl
 import os
 import shutil
 import threading
+import time
+import weakref
 import lxml.etree as etree
-from io import BytesIO
-from re import sub
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from stat import S_ISDIR
+from urllib.parse import unquote
+from xml.parsers import expat
+from xml.sax.saxutils import quoteattr
 from webdav.connection import *
 from webdav.exceptions import *
 from webdav.urn import Urn
 
-try:
-    from urllib.parse import unquote
-except ImportError:
-    from urllib import unquote
-
 __version__ = "1.0.8"
 
 
 def listdir(directory):
 
     file_names = list()
-    for filename in os.listdir(directory):
-        file_path = os.path.join(directory, filename)
-        if os.path.isdir(file_path):
-            filename = "{filename}{separate}".format(filename=filename, separate=os.path.sep)
-        file_names.append(filename)
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            filename = entry.name
+            if entry.is_dir():
+                filename = "{filename}{separate}".format(filename=filename, separate=os.path.sep)
+            file_names.append(filename)
     return file_names
 
 
+def check_local_directory(local_path):
+
+    try:
+        local_stat = os.stat(local_path)
+    except FileNotFoundError:
+        raise LocalResourceNotFound(local_path)
+
+    if not S_ISDIR(local_stat.st_mode):
+        raise OptionNotValid(name="local_path", value=local_path)
+
+
+def link_path(children, path):
+
+    while path:
+        parent, _, _ = path.rpartition(Urn.separate)
+        siblings = children.setdefault(parent, set())
+        if path in siblings:
+            return
+        siblings.add(path)
+        path = parent
+
+
+xml_parser = etree.XMLParser(collect_ids=False, resolve_entities=False, huge_tree=True)
+
+
+option_codes = {key: value for (key, value) in vars(pycurl).items() if key.isupper() and isinstance(value, int)}
+
+
 def add_options(request, options):
 
     for (key, value) in options.items():
         if value is None:
             continue
-        try:
-            request.setopt(pycurl.__dict__[key], value)
-        except TypeError:
+        code = option_codes.get(key)
+        if code is None:
             raise OptionNotValid(key, value)
-        except pycurl.error:
+        try:
+            request.setopt(code, value)
+        except (TypeError, pycurl.error):
             raise OptionNotValid(key, value)
 
 
@@ -59,47 +91,174 @@ def get_options(type, from_options):
     return _options
 
 
+def skip_body(data):
+    pass
+
+
+def property_name(option):
+
+    namespace = option.get('namespace') or None
+    try:
+        return etree.QName(namespace, option['name'])
+    except ValueError:
+        value = "{{{namespace}}}{name}".format(namespace=namespace, name=option['name']) if namespace else option['name']
+        raise OptionNotValid(name="name", value=value)
+
+
+def propfind_body(names):
+
+    root = etree.Element("{DAV:}propfind", nsmap={'d': "DAV:"})
+    prop = etree.SubElement(root, "{DAV:}prop")
+    for name in names:
+        etree.SubElement(prop, name)
+    return etree.tostring(root, encoding='utf-8')
+
+
+def proppatch_body(name, value):
+
+    root = etree.Element("{DAV:}propertyupdate", nsmap={'d': "DAV:"})
+    prop = etree.SubElement(etree.SubElement(root, "{DAV:}set"), "{DAV:}prop")
+    try:
+        etree.SubElement(prop, name).text = value
+    except ValueError:
+        raise OptionNotValid(name="value", value=value)
+    return etree.tostring(root, encoding='utf-8')
+
+
+def batch_progress(progress):
+
+    transfers = list()
+
+    def track(download_total=0, upload_total=0):
+
+        index = len(transfers)
+        transfers.append((download_total, 0, upload_total, 0))
+
+        def report(download_t, download_d, upload_t, upload_d):
+            transfers[index] = (download_t or download_total, download_d, upload_t or upload_total, upload_d)
+            return progress(*(sum(values) for values in zip(*transfers)))
+
+        return report
+
+    return track
+
+
+def stream_writer(feed):
+
+    errors = list()
+
+    def write(data):
+        if errors:
+            return
+        try:
+            feed(data)
+        except (etree.XMLSyntaxError, expat.ExpatError) as error:
+            errors.append(error)
+
+    return write, errors
+
+
+def feed_responses(parser, handle):
+
+    def feed(data):
+        parser.feed(data)
+        for _, element in parser.read_events():
+            handle(element)
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    return feed
+
+
+def href_parser(hrefs):
+
+    path = list()
+    text = list()
+    response = dict()
+
+    def start_element(name, attributes):
+        path.append(name)
+        del text[:]
+        if name == "DAV: response":
+            response.clear()
+        elif name == "DAV: resourcetype":
+            response.setdefault('collection', False)
+        elif name == "DAV: collection" and path[-2:-1] == ["DAV: resourcetype"]:
+            response['collection'] = True
+
+    def character_data(data):
+        text.append(data)
+
+    def end_element(name):
+        if name == "DAV: href" and path[-2:-1] == ["DAV: response"]:
+            response['href'] = "".join(text)
+        elif name == "DAV: response" and 'href' in response:
+            href = response['href']
+            collection = response.get('collection')
+            if collection is not None:
+                href = href.rstrip(Urn.separate)
+                if collection:
+                    href += Urn.separate
+            hrefs.append(href)
+        path.pop()
+
+    parser = expat.ParserCreate(namespace_separator=" ")
+    parser.StartElementHandler = start_element
+    parser.CharacterDataHandler = character_data
+    parser.EndElementHandler = end_element
+
+    return parser
+
+
 class Client(object):
 
     root = '/'
-    large_size = 2 * 1024 * 1024 * 1024
+    max_in_flight = 8
+    max_queued = 64
+    cache_ttl = 5
+    cache_limit = 4096
+    modified_tolerance = 2
+    buffer_size = 512 * 1024
+    upload_buffer_size = 2 * 1024 * 1024
+    keep_alive = 60
+    http2 = bool(pycurl.version_info()[4] & pycurl.VERSION_HTTP2)
+    progress_option = 'XFERINFOFUNCTION' if hasattr(pycurl, 'XFERINFOFUNCTION') else 'PROGRESSFUNCTION'
 
     http_header = {
         'list': ["Accept: */*", "Depth: 1"],
+        'list_tree': ["Accept: */*", "Depth: infinity"],
         'free': ["Accept: */*", "Depth: 0", "Content-Type: text/xml"],
         'copy': ["Accept: */*"],
         'move': ["Accept: */*"],
         'mkdir': ["Accept: */*", "Connection: Keep-Alive"],
         'clean': ["Accept: */*", "Connection: Keep-Alive"],
-        'check': ["Accept: */*"],
+        'check': ["Accept: */*", "Depth: 0", "Content-Type: text/xml"],
         'info': ["Accept: */*", "Depth: 1"],
         'get_metadata': ["Accept: */*", "Depth: 1", "Content-Type: application/x-www-form-urlencoded"],
-        'set_metadata': ["Accept: */*", "Depth: 1", "Content-Type: application/x-www-form-urlencoded"]
+        'get_metadata_tree': ["Accept: */*", "Depth: infinity", "Content-Type: application/x-www-form-urlencoded"],
+        'set_metadata': ["Accept: */*", "Content-Type: text/xml"]
     }
 
     def get_header(self, method):
+        return self.headers.get(method, self.token_header)
 
-        if method in Client.http_header:
-            try:
-                header = Client.http_header[method].copy()
-            except AttributeError:
-                header = Client.http_header[method][:]
-        else:
-            header = list()
+    def get_url(self, path):
+        return self.url + path
 
-        if self.webdav.token:
-            webdav_token = "Authorization: OAuth {token}".format(token=self.webdav.token)
-            header.append(webdav_token)
+    def get_destination_header(self, method, urn):
 
-        return header
+        destination = "Destination: {root}{path}".format(root=self.webdav.root, path=urn.quote())
+        return self.get_header(method) + (destination,)
 
     requests = {
         'copy': "COPY",
         'move': "MOVE",
         'mkdir': "MKCOL",
         'clean': "DELETE",
-        'check': "HEAD",
+        'check': "PROPFIND",
         'list': "PROPFIND",
+        'list_tree': "PROPFIND",
         'free': "PROPFIND",
         'info': "PROPFIND",
         'publish': "PROPPATCH",
@@ -113,6 +272,29 @@ class Client(object):
         'https://webdav.yandex.ru': "urn:yandex:disk:meta",
     }
 
+    bodies = {
+        'free': b'<propfind xmlns="DAV:"><prop><quota-available-bytes/><quota-used-bytes/></prop></propfind>',
+        'check': b'<propfind xmlns="DAV:"><prop><resourcetype/></prop></propfind>',
+        'publish': '<propertyupdate xmlns="DAV:"><set><prop><public_url xmlns={xmlns}>true</public_url></prop></set></propertyupdate>',
+        'unpublish': '<propertyupdate xmlns="DAV:"><remove><prop><public_url xmlns={xmlns}/></prop></remove></propertyupdate>'
+    }
+
+    namespaces = {'d': "DAV:"}
+
+    xpath = {
+        'quota_available_bytes': etree.XPath("//d:quota-available-bytes", namespaces=namespaces),
+        'public_url': etree.XPath("//*[local-name() = 'public_url']"),
+        'created': etree.XPath(".//d:creationdate/text()", namespaces=namespaces),
+        'name': etree.XPath(".//d:displayname/text()", namespaces=namespaces),
+        'size': etree.XPath(".//d:getcontentlength/text()", namespaces=namespaces),
+        'modified': etree.XPath(".//d:getlastmodified/text()", namespaces=namespaces),
+        'href': etree.XPath("string(d:href)", namespaces=namespaces),
+        'resource_type': etree.XPath(".//d:resourcetype", namespaces=namespaces),
+        'collection': etree.XPath("d:collection", namespaces=namespaces),
+        'propstat': etree.XPath("d:propstat[contains(d:status, ' 200 ')]/d:prop", namespaces=namespaces),
+        'status': etree.XPath("//d:propstat/d:status/text()", namespaces=namespaces),
+    }
+
     def __init__(self, options):
 
         webdav_options = get_options(type=WebDAVSettings, from_options=options)
@@ -123,23 +305,35 @@ class Client(object):
 
         pycurl.global_init(pycurl.GLOBAL_DEFAULT)
 
-        self.default_options = {}
-
-    def __del__(self):
-        pycurl.global_cleanup()
-
-    def valid(self):
-        return True if self.webdav.valid() and self.proxy.valid() else False
-
-    def Request(self, options=None):
+        self.share = None
+        if not self.webdav.non_persistent:
+            self.share = pycurl.CurlShare()
+            self.share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_DNS)
+            self.share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_SSL_SESSION)
+            if hasattr(pycurl, 'LOCK_DATA_CONNECT'):
+                self.share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_CONNECT)
 
-        curl = pycurl.Curl()
+        self.url = "{hostname}{root}".format(hostname=self.webdav.hostname, root=self.webdav.root)
+        self.token_header = tuple()
+        if self.webdav.token:
+            self.token_header = ("Authorization: OAuth {token}".format(token=self.webdav.token),)
+        self.headers = {method: tuple(header) + self.token_header for (method, header) in Client.http_header.items()}
 
-        self.default_options.update({
+        self.default_options = {
             'URL': self.webdav.hostname,
-            'NOBODY': 1,
+            'NOBODY': 0,
+            'WRITEFUNCTION': skip_body,
             'SSLVERSION': pycurl.SSLVERSION_TLSv1,
-        })
+            'BUFFERSIZE': Client.buffer_size,
+            'NOSIGNAL': 1,
+        }
+
+        if hasattr(pycurl, 'UPLOAD_BUFFERSIZE'):
+            self.default_options['UPLOAD_BUFFERSIZE'] = Client.upload_buffer_size
+
+        if Client.http2:
+            self.default_options['HTTP_VERSION'] = pycurl.CURL_HTTP_VERSION_2TLS
+            self.default_options['PIPEWAIT'] = 1
 
         if not self.webdav.token:
             server_token = '{login}:{password}'.format(login=self.webdav.login, password=self.webdav.password)
@@ -172,68 +366,406 @@ class Client(object):
 
         if self.webdav.verbose:
             self.default_options['VERBOSE'] = self.webdav.verbose
-        
+
+        if self.share:
+            self.default_options['SHARE'] = self.share
+            self.default_options['MAXCONNECTS'] = self.max_in_flight
+            if hasattr(pycurl, 'TCP_KEEPALIVE'):
+                self.default_options['TCP_KEEPALIVE'] = 1
+                self.default_options['TCP_KEEPIDLE'] = Client.keep_alive
+                self.default_options['TCP_KEEPINTVL'] = Client.keep_alive
+        else:
+            self.default_options['FORBID_REUSE'] = 1
+
+        self.local = threading.local()
+        self.handles = weakref.WeakSet()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="webdav")
+        self.transfers = threading.BoundedSemaphore(self.max_queued)
+        self.cache = dict()
+        self.cache_children = dict()
+        self.cache_sweep = self.cache_limit
+        self.cache_lock = threading.Lock()
+
+    def __del__(self):
+        pycurl.global_cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+
+        self.executor.shutdown()
+
+        for curl in list(self.handles):
+            curl.close()
+        self.handles.clear()
+
+        if self.share:
+            self.share.close()
+            self.share = None
+
+    def valid(self):
+        return True if self.webdav.valid() and self.proxy.valid() else False
+
+    def Request(self, options=None, curl=None):
+
+        if curl is None:
+            curl = getattr(self.local, 'curl', None)
+            if curl is None:
+                curl = self.local.curl = pycurl.Curl()
+                self.handles.add(curl)
+            else:
+                curl.reset()
+                curl.unsetopt(pycurl.SHARE)
+
         if self.default_options:
             add_options(curl, self.default_options)
 
         if options:
             add_options(curl, options)
+            if options.get('NOBODY'):
+                curl.setopt(pycurl.FORBID_REUSE, 1)
 
         return curl
 
+    def perform(self, request, path, destination=None):
+
+        try:
+            request.perform()
+        except pycurl.error as error:
+            if error.args[0] != pycurl.E_HTTP_RETURNED_ERROR:
+                raise
+
+        code = request.getinfo(pycurl.HTTP_CODE)
+        self.raise_for_code(code, path, destination)
+
+        return code
+
+    def raise_for_code(self, code, path, destination=None):
+
+        if code == 404:
+            raise RemoteResourceNotFound(path)
+        if code == 409:
+            raise RemoteParentNotFound(destination or path)
+        if code == 507:
+            raise NotEnoughSpace()
+        if not 200 <= code < 300:
+            raise ResponseErrorCode(path, code)
+
+    def cached(self, kind, path):
+
+        key = path.rstrip(Urn.separate)
+        with self.cache_lock:
+            entries = self.cache.get(key)
+            entry = entries.get(kind) if entries else None
+            if entry and entry[0] <= time.monotonic():
+                del entries[kind]
+                entry = None
+        return entry
+
+    def remember(self, kind, path, value):
+
+        if self.cache_ttl:
+            key = path.rstrip(Urn.separate)
+            with self.cache_lock:
+                entries = self.cache.get(key)
+                if entries is None:
+                    entries = self.cache[key] = dict()
+                    link_path(self.cache_children, key)
+                entries[kind] = (time.monotonic() + self.cache_ttl, value)
+
+                if len(self.cache) > self.cache_sweep:
+                    now = time.monotonic()
+                    self.cache = {key: entries for (key, entries) in self.cache.items() if any(expires > now for (expires, _) in entries.values())}
+                    self.cache_children = dict()
+                    for key in self.cache:
+                        link_path(self.cache_children, key)
+                    self.cache_sweep = max(self.cache_limit, 2 * len(self.cache))
+
+    def forget(self, *paths):
+
+        with self.cache_lock:
+            for path in paths:
+                key = Urn(path).path().rstrip(Urn.separate)
+                parent, _, _ = key.rpartition(Urn.separate)
+                entries = self.cache.get(parent)
+                if entries:
+                    entries.pop('list', None)
+                self.cache_children.get(parent, set()).discard(key)
+                keys = [key]
+                while keys:
+                    key = keys.pop()
+                    self.cache.pop(key, None)
+                    keys.extend(self.cache_children.pop(key, ()))
+
+    def perform_multi(self, requests):
+
+        def priority(item):
+            index, (options, _) = item
+            return options.get('INFILESIZE_LARGE', 0), -index
+
+        multi = pycurl.CurlMulti()
+        multi.setopt(pycurl.M_MAX_TOTAL_CONNECTIONS, self.max_in_flight)
+        multi.setopt(pycurl.M_MAX_HOST_CONNECTIONS, self.max_in_flight)
+        if Client.http2:
+            multi.setopt(pycurl.M_PIPELINING, pycurl.PIPE_MULTIPLEX)
+
+        pending = sorted(enumerate(requests), key=priority)
+        active = dict()
+        free_handles = list()
+        codes = [None] * len(requests)
+
+        try:
+            while pending or active:
+                while pending and len(active) < self.max_in_flight:
+                    index, (options, local_path) = pending.pop()
+                    local_file = None
+                    if local_path:
+                        if options.get('UPLOAD'):
+                            local_file = open(local_path, 'rb')
+                            options['READDATA'] = local_file
+                        else:
+                            local_file = open(local_path, 'wb')
+                            options['WRITEDATA'] = local_file
+                    curl = free_handles.pop() if free_handles else pycurl.Curl()
+                    active[curl] = (index, local_file)
+                    self.Request(options=options, curl=curl)
+                    multi.add_handle(curl)
+
+                ret = pycurl.E_CALL_MULTI_PERFORM
+                while ret == pycurl.E_CALL_MULTI_PERFORM:
+                    ret, _ = multi.perform()
+
+                queued = 1
+                while queued:
+                    queued, succeeded, failed = multi.info_read()
+                    for (curl, error, _) in failed:
+                        if error != pycurl.E_HTTP_RETURNED_ERROR:
+                            raise NotConnection(self.webdav.hostname)
+                        succeeded.append(curl)
+                    for curl in succeeded:
+                        index, local_file = active.pop(curl)
+                        if local_file:
+                            local_file.close()
+                        codes[index] = curl.getinfo(pycurl.HTTP_CODE)
+                        multi.remove_handle(curl)
+                        curl.reset()
+                        curl.unsetopt(pycurl.SHARE)
+                        free_handles.append(curl)
+
+                if active:
+                    multi.select(1.0)
+        finally:
+            for (curl, (_, local_file)) in active.items():
+                if local_file:
+                    local_file.close()
+                multi.remove_handle(curl)
+                curl.close()
+            for curl in free_handles:
+                curl.close()
+            multi.close()
+
+        for ((options, _), code) in zip(requests, codes):
+            self.raise_for_code(code, unquote(options['URL'][len(self.url):]))
+
+        return codes
+
+    def download_request(self, remote_path, local_path, progress=None):
+
+        options = {
+            'URL': self.get_url(Urn(remote_path).quote()),
+            'HTTPHEADER': self.get_header('download_file'),
+            'FAILONERROR': 1,
+            'NOPROGRESS': 0 if progress else 1,
+            'NOBODY': 0
+        }
+
+        if progress:
+            options[Client.progress_option] = progress
+
+        return options, local_path
+
+    def upload_request(self, remote_path, local_path, size, progress=None):
+
+        options = {
+            'URL': self.get_url(Urn(remote_path).quote()),
+            'HTTPHEADER': self.get_header('upload_file'),
+            'UPLOAD': 1,
+            'INFILESIZE_LARGE': size,
+            'NOPROGRESS': 0 if progress else 1
+        }
+
+        if progress:
+            options[Client.progress_option] = progress
+
+        return options, local_path
+
     def list(self, remote_path=root):
 
-        def parse(response):
+        def parse(parser, hrefs, errors, directory):
 
             try:
-                response_str = response.getvalue()
-                tree = etree.fromstring(response_str)
-                hrees = [unquote(hree.text) for hree in tree.findall(".//{DAV:}href")]
-                return [Urn(hree) for hree in hrees]
-            except etree.XMLSyntaxError:
-                return list()
+                if errors:
+                    raise errors[0]
+                parser.Parse(b"", True)
+            except expat.ExpatError:
+                raise MethodNotSupported(name="list", server=self.webdav.hostname)
+
+            names = list()
+            for href in hrefs:
+                path = unquote(href)
+                if path == directory or path == directory[:-1]:
+                    continue
+                if path[-1] == Urn.separate:
+                    _, _, name = path[:-1].rpartition(Urn.separate)
+                    names.append(name + Urn.separate)
+                else:
+                    _, _, name = path.rpartition(Urn.separate)
+                    names.append(name)
+            return names
 
         try:
             directory_urn = Urn(remote_path, directory=True)
 
-            if directory_urn.path() != Client.root:
-                if not self.check(directory_urn.path()):
-                    raise RemoteResourceNotFound(directory_urn.path())
+            entry = self.cached('list', directory_urn.path())
+            if entry:
+                return list(entry[1])
 
-            response = BytesIO()
+            hrefs = list()
+            parser = href_parser(hrefs)
+            write, errors = stream_writer(lambda data: parser.Parse(data, False))
 
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': directory_urn.quote()}
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+                'URL': self.get_url(directory_urn.quote()),
                 'CUSTOMREQUEST': Client.requests['list'],
+                'ACCEPT_ENCODING': "",
                 'HTTPHEADER': self.get_header('list'),
-                'WRITEDATA': response,
+                'WRITEFUNCTION': write,
                 'NOBODY': 0
             }
 
             request = self.Request(options=options)
 
-            request.perform()
-            request.close()
+            code = self.perform(request, directory_urn.path())
+            if code != 207:
+                raise MethodNotSupported(name="list", server=self.webdav.hostname)
 
-            urns = parse(response)
+            directory = directory_urn.path()
+            names = parse(parser, hrefs, errors, "{root}{path}".format(root=self.webdav.root, path=directory))
 
-            path = "{root}{path}".format(root=self.webdav.root, path=directory_urn.path())
-            return [urn.filename() for urn in urns if urn.path() != path and urn.path() != path[:-1]]
+            self.remember('list', directory, tuple(names))
+            self.remember('check', directory, True)
+            self.remember('is_dir', directory, True)
+            for name in names:
+                path = "{parent}{name}".format(parent=directory, name=name)
+                self.remember('check', path, True)
+                self.remember('is_dir', path, name[-1] == Urn.separate)
+
+            return names
+
+        except pycurl.error:
+            raise NotConnection(self.webdav.hostname)
+
+    def list_tree(self, remote_path=root):
+
+        def parse(parser, hrefs, errors, directory):
+
+            tree = dict()
+            try:
+                if errors:
+                    return tree
+                parser.Parse(b"", True)
+            except expat.ExpatError:
+                return tree
+
+            for href in hrefs:
+                urn = Urn.from_quoted(href)
+                path = urn.path()
+                if path.startswith(self.webdav.root):
+                    path = path[len(self.webdav.root):]
+                if urn.is_dir():
+                    tree.setdefault(path, list())
+                if path != directory:
+                    tree.setdefault(Urn(path).parent(), list()).append(urn.filename())
+                self.remember('check', path, True)
+                self.remember('is_dir', path, urn.is_dir())
+
+            return tree
+
+        def listing(urn, method):
+
+            hrefs = list()
+            parser = href_parser(hrefs)
+            write, errors = stream_writer(lambda data: parser.Parse(data, False))
+
+            options = {
+                'URL': self.get_url(urn.quote()),
+                'CUSTOMREQUEST': Client.requests[method],
+                'ACCEPT_ENCODING': "",
+                'HTTPHEADER': self.get_header(method),
+                'WRITEFUNCTION': write,
+                'NOBODY': 0
+            }
+
+            return options, lambda: parse(parser, hrefs, errors, urn.path())
+
+        try:
+            directory_urn = Urn(remote_path, directory=True)
+
+            options, result = listing(directory_urn, 'list_tree')
+            request = self.Request(options=options)
+
+            request.perform()
+            code = request.getinfo(pycurl.HTTP_CODE)
+
+            directory = directory_urn.path()
+            tree = result() if code == 207 else dict()
+            if directory not in tree:
+                tree = dict()
+                listed = set()
+                level = [directory]
+            elif any(names for (path, names) in tree.items() if path != directory):
+                listed = set(tree)
+                level = list()
+            else:
+                listed = {directory}
+                level = [path for path in tree if path != directory]
+
+            while level:
+                listings = [listing(Urn(path, directory=True), 'list') for path in level]
+                codes = self.perform_multi([(options, None) for (options, _) in listings])
+                next_level = list()
+                for (path, code, (_, result)) in zip(level, codes, listings):
+                    children = result() if code == 207 else dict()
+                    if path not in children:
+                        raise MethodNotSupported(name="list_tree", server=self.webdav.hostname)
+                    tree.update(children)
+                    listed.add(path)
+                    next_level.extend(child for child in children if child != path)
+                level = next_level
+
+            for path in listed:
+                self.remember('list', path, tuple(tree[path]))
+
+            return tree
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
 
     def free(self):
 
-        def parse(response):
+        def parse(parser, errors):
 
             try:
-                response_str = response.getvalue()
-                tree = etree.fromstring(response_str)
-                node = tree.find('.//{DAV:}quota-available-bytes')
-                if node is not None:
-                    return int(node.text)
+                if errors:
+                    raise errors[0]
+                tree = parser.close()
+                result = Client.xpath['quota_available_bytes'](tree)
+                if result:
+                    return int(result[0].text)
                 else:
                     raise MethodNotSupported(name='free', server=self.webdav.hostname)
             except TypeError:
@@ -241,34 +773,24 @@ class Client(object):
             except etree.XMLSyntaxError:
                 return str()
 
-        def data():
-
-            root = etree.Element("propfind", xmlns="DAV:")
-            prop = etree.SubElement(root, "prop")
-            etree.SubElement(prop, "quota-available-bytes")
-            etree.SubElement(prop, "quota-used-bytes")
-            tree = etree.ElementTree(root)
-            buff = BytesIO()
-            tree.write(buff)
-            return buff.getvalue()
-
         try:
-            response = BytesIO()
+            parser = etree.XMLParser()
+            write, errors = stream_writer(parser.feed)
 
             options = {
                 'CUSTOMREQUEST': Client.requests['free'],
+                'ACCEPT_ENCODING': "",
                 'HTTPHEADER': self.get_header('free'),
-                'POSTFIELDS': data(),
-                'WRITEDATA': response,
+                'POSTFIELDS': Client.bodies['free'],
+                'WRITEFUNCTION': write,
                 'NOBODY': 0
             }
 
             request = self.Request(options=options)
 
             request.perform()
-            request.close()
 
-            return parse(response)
+            return parse(parser, errors)
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
@@ -277,27 +799,30 @@ class Client(object):
 
         try:
             urn = Urn(remote_path)
-            response = BytesIO()
 
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn.quote()}
+            entry = self.cached('check', urn.path())
+            if entry:
+                return entry[1]
+
+            # Not HEAD: servers may still send a body with a HEAD error, which would poison the pooled connection.
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+                'URL': self.get_url(urn.quote()),
                 'CUSTOMREQUEST': Client.requests['check'],
                 'HTTPHEADER': self.get_header('check'),
-                'WRITEDATA': response,
-                'NOBODY': 1
+                'POSTFIELDS': Client.bodies['check'],
+                'NOBODY': 0
             }
 
             request = self.Request(options=options)
 
             request.perform()
             code = request.getinfo(pycurl.HTTP_CODE)
-            request.close()
 
-            if int(code) == 200:
-                return True
-        
-            return False
+            exists = 200 <= code < 300
+            if exists or code == 404:
+                self.remember('check', urn.path(), exists)
+
+            return exists
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
@@ -307,20 +832,16 @@ class Client(object):
         try:
             directory_urn = Urn(remote_path, directory=True)
 
-            if not self.check(directory_urn.parent()):
-                raise RemoteParentNotFound(directory_urn.path())
-
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': directory_urn.quote()}
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+                'URL': self.get_url(directory_urn.quote()),
                 'CUSTOMREQUEST': Client.requests['mkdir'],
                 'HTTPHEADER': self.get_header('mkdir')
             }
 
             request = self.Request(options=options)
 
-            request.perform()
-            request.close()
+            self.perform(request, directory_urn.path())
+            self.forget(directory_urn.path())
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
@@ -333,21 +854,17 @@ class Client(object):
             if self.is_dir(urn.path()):
                 raise OptionNotValid(name="remote_path", value=remote_path)
 
-            if not self.check(urn.path()):
-                raise RemoteResourceNotFound(urn.path())
-
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn.quote()}
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
-                'WRITEFUNCTION': buff.write,
+                'URL': self.get_url(urn.quote()),
+                'WRITEDATA': buff,
+                'FAILONERROR': 1,
                 'HTTPHEADER': self.get_header('download_to'),
                 'NOBODY': 0
             }
 
             request = self.Request(options=options)
 
-            request.perform()
-            request.close()
+            self.perform(request, urn.path())
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
@@ -372,10 +889,33 @@ class Client(object):
 
         os.makedirs(local_path)
 
-        for resource_name in self.list(urn.path()):
-            _remote_path = "{parent}{name}".format(parent=urn.path(), name=resource_name)
-            _local_path = os.path.join(local_path, resource_name)
-            self.download(local_path=_local_path, remote_path=_remote_path, progress=progress)
+        tree = self.list_tree(urn.path())
+
+        track = batch_progress(progress) if progress else None
+        sizes = self.get_metadata_tree(urn.path()) if progress else dict()
+
+        requests = list()
+        directories = deque([(urn.path(), local_path)])
+        while directories:
+            remote_directory, local_directory = directories.popleft()
+
+            resource_names = tree.get(remote_directory)
+            if resource_names is None:
+                resource_names = self.list(remote_directory)
+
+            for resource_name in resource_names:
+                _remote_path = "{parent}{name}".format(parent=remote_directory, name=resource_name)
+                _local_path = os.path.join(local_directory, resource_name)
+                if resource_name.endswith(Urn.separate):
+                    os.mkdir(_local_path)
+                    directories.append((_remote_path, _local_path))
+                    continue
+
+                size, _ = sizes.get(_remote_path[len(urn.path()):], (None, None))
+                file_progress = track(download_total=size or 0) if track else None
+                requests.append(self.download_request(remote_path=_remote_path, local_path=_local_path, progress=file_progress))
+
+        self.perform_multi(requests)
 
     def download_file(self, remote_path, local_path, progress=None):
 
@@ -388,31 +928,39 @@ class Client(object):
             if os.path.isdir(local_path):
                 raise OptionNotValid(name="local_path", value=local_path)
 
-            if not self.check(urn.path()):
-                raise RemoteResourceNotFound(urn.path())
-
             with open(local_path, 'wb') as local_file:
 
-                url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn.quote()}
                 options = {
-                    'URL': "{hostname}{root}{path}".format(**url),
+                    'URL': self.get_url(urn.quote()),
                     'HTTPHEADER': self.get_header('download_file'),
                     'WRITEDATA': local_file,
+                    'FAILONERROR': 1,
                     'NOPROGRESS': 0 if progress else 1,
                     'NOBODY': 0
                 }
 
                 if progress:
-                   options["PROGRESSFUNCTION"] = progress
+                    options[Client.progress_option] = progress
 
                 request = self.Request(options=options)
 
-                request.perform()
-                request.close()
+                self.perform(request, urn.path())
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
 
+    def submit(self, transfer, **kwargs):
+
+        self.transfers.acquire()
+        try:
+            future = self.executor.submit(transfer, **kwargs)
+        except BaseException:
+            self.transfers.release()
+            raise
+
+        future.add_done_callback(lambda future: self.transfers.release())
+        return future
+
     def download_sync(self, remote_path, local_path, callback=None):
 
         self.download(local_path=local_path, remote_path=remote_path)
@@ -422,8 +970,7 @@ class Client(object):
 
     def download_async(self, remote_path, local_path, callback=None):
 
-        target = (lambda: self.download_sync(local_path=local_path, remote_path=remote_path, callback=callback))
-        threading.Thread(target=target).start()
+        return self.submit(self.download_sync, local_path=local_path, remote_path=remote_path, callback=callback)
 
     def upload_from(self, buff, remote_path):
 
@@ -433,25 +980,17 @@ class Client(object):
             if urn.is_dir():
                 raise OptionNotValid(name="remote_path", value=remote_path)
 
-            if not self.check(urn.parent()):
-                raise RemoteParentNotFound(urn.path())
-
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn.quote()}
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+                'URL': self.get_url(urn.quote()),
                 'HTTPHEADER': self.get_header('upload_from'),
                 'UPLOAD': 1,
-                'READFUNCTION': buff.read,
+                'READDATA': buff,
             }
 
             request = self.Request(options=options)
 
-            request.perform()
-            code = request.getinfo(pycurl.HTTP_CODE)
-            if code == "507":
-                raise NotEnoughSpace()
-
-            request.close()
+            self.perform(request, urn.path())
+            self.forget(urn.path())
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
@@ -470,26 +1009,43 @@ class Client(object):
         if not urn.is_dir():
             raise OptionNotValid(name="remote_path", value=remote_path)
 
-        if not os.path.isdir(local_path):
-            raise OptionNotValid(name="local_path", value=local_path)
-
-        if not os.path.exists(local_path):
-            raise LocalResourceNotFound(local_path)
+        check_local_directory(local_path)
 
-        if self.check(urn.path()):
+        try:
             self.clean(urn.path())
+        except RemoteResourceNotFound:
+            pass
 
         self.mkdir(remote_path)
 
-        for resource_name in listdir(local_path):
-            _remote_path = "{parent}{name}".format(parent=urn.path(), name=resource_name)
-            _local_path = os.path.join(local_path, resource_name)
-            self.upload(local_path=_local_path, remote_path=_remote_path, progress=progress)
+        track = batch_progress(progress) if progress else None
+
+        requests = list()
+        directories = deque([(urn.path(), local_path)])
+        while directories:
+            remote_directory, local_directory = directories.popleft()
+            with os.scandir(local_directory) as entries:
+                for entry in entries:
+                    _remote_path = "{parent}{name}".format(parent=remote_directory, name=entry.name)
+                    if entry.is_dir():
+                        _remote_path = "{path}{sep}".format(path=_remote_path, sep=Urn.separate)
+                        self.mkdir(_remote_path)
+                        directories.append((_remote_path, entry.path))
+                        continue
+
+                    file_size = entry.stat().st_size
+                    file_progress = track(upload_total=file_size) if track else None
+                    requests.append(self.upload_request(remote_path=_remote_path, local_path=entry.path, size=file_size, progress=file_progress))
+
+        self.perform_multi(requests)
+        self.forget(urn.path())
 
     def upload_file(self, remote_path, local_path, progress=None):
 
         try:
-            if not os.path.exists(local_path):
+            try:
+                local_stat = os.stat(local_path)
+            except FileNotFoundError:
                 raise LocalResourceNotFound(local_path)
 
             urn = Urn(remote_path)
@@ -497,40 +1053,27 @@ class Client(object):
             if urn.is_dir():
                 raise OptionNotValid(name="remote_path", value=remote_path)
 
-            if os.path.isdir(local_path):
+            if S_ISDIR(local_stat.st_mode):
                 raise OptionNotValid(name="local_path", value=local_path)
 
-            if not self.check(urn.parent()):
-                raise RemoteParentNotFound(urn.path())
-
             with open(local_path, "rb") as local_file:
 
-                url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn.quote()}
                 options = {
-                    'URL': "{hostname}{root}{path}".format(**url),
+                    'URL': self.get_url(urn.quote()),
                     'HTTPHEADER': self.get_header('upload_file'),
                     'UPLOAD': 1,
-                    'READFUNCTION': local_file.read,
+                    'READDATA': local_file,
+                    'INFILESIZE_LARGE': local_stat.st_size,
                     'NOPROGRESS': 0 if progress else 1
                 }
 
                 if progress:
-                   options["PROGRESSFUNCTION"] = progress
-
-                file_size = os.path.getsize(local_path)
-                if file_size > self.large_size:
-                    options['INFILESIZE_LARGE'] = file_size
-                else:
-                    options['INFILESIZE'] = file_size
+                    options[Client.progress_option] = progress
 
                 request = self.Request(options=options)
 
-                request.perform()
-                code = request.getinfo(pycurl.HTTP_CODE)
-                if code == "507":
-                    raise NotEnoughSpace()
-
-                request.close()
+                self.perform(request, urn.path())
+                self.forget(urn.path())
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
@@ -544,81 +1087,46 @@ class Client(object):
 
     def upload_async(self, remote_path, local_path, callback=None):
 
-        target = (lambda: self.upload_sync(local_path=local_path, remote_path=remote_path, callback=callback))
-        threading.Thread(target=target).start()
+        return self.submit(self.upload_sync, local_path=local_path, remote_path=remote_path, callback=callback)
 
     def copy(self, remote_path_from, remote_path_to):
 
-        def header(remote_path_to):
-
-            path = Urn(remote_path_to).path()
-            destination = "{root}{path}".format(root=self.webdav.root, path=path)
-            header_item = "Destination: {destination}".format(destination=destination)
-
-            header = self.get_header('copy')
-            header.append(header_item)
-
-            return header
-
         try:
             urn_from = Urn(remote_path_from)
 
-            if not self.check(urn_from.path()):
-                raise RemoteResourceNotFound(urn_from.path())
-
             urn_to = Urn(remote_path_to)
 
-            if not self.check(urn_to.parent()):
-                raise RemoteParentNotFound(urn_to.path())
-
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn_from.quote()}
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+                'URL': self.get_url(urn_from.quote()),
                 'CUSTOMREQUEST': Client.requests['copy'],
-                'HTTPHEADER': header(remote_path_to)
+                'HTTPHEADER': self.get_destination_header('copy', urn_to)
             }
 
             request = self.Request(options=options)
 
-            request.perform()
-            request.close()
+            self.perform(request, urn_from.path(), urn_to.path())
+            self.forget(urn_to.path())
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
 
     def move(self, remote_path_from, remote_path_to):
 
-        def header(remote_path_to):
-
-            path = Urn(remote_path_to).path()
-            destination = "{root}{path}".format(root=self.webdav.root, path=path)
-            header_item = "Destination: {destination}".format(destination=destination)
-            header = self.get_header('move')
-            header.append(header_item)
-            return header
-
         try:
             urn_from = Urn(remote_path_from)
 
-            if not self.check(urn_from.path()):
-                raise RemoteResourceNotFound(urn_from.path())
-
             urn_to = Urn(remote_path_to)
 
-            if not self.check(urn_to.parent()):
-                raise RemoteParentNotFound(urn_to.path())
-
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn_from.quote()}
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+                'URL': self.get_url(urn_from.quote()),
                 'CUSTOMREQUEST': Client.requests['move'],
-                'HTTPHEADER': header(remote_path_to)
+                'HTTPHEADER': self.get_destination_header('move', urn_to)
             }
 
             request = self.Request(options=options)
 
-            request.perform()
-            request.close()
+            self.perform(request, urn_from.path(), urn_to.path())
+            self.forget(urn_from.path(), urn_to.path())
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
@@ -628,29 +1136,29 @@ class Client(object):
         try:
             urn = Urn(remote_path)
 
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn.quote()}
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+                'URL': self.get_url(urn.quote()),
                 'CUSTOMREQUEST': Client.requests['clean'],
                 'HTTPHEADER': self.get_header('clean')
             }
 
             request = self.Request(options=options)
 
-            request.perform()
-            request.close()
+            self.perform(request, urn.path())
+            self.forget(urn.path())
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
 
     def publish(self, remote_path):
 
-        def parse(response):
+        def parse(parser, errors):
 
             try:
-                response_str = response.getvalue()
-                tree = etree.fromstring(response_str)
-                result = tree.xpath("//*[local-name() = 'public_url']")
+                if errors:
+                    raise errors[0]
+                tree = parser.close()
+                result = Client.xpath['public_url'](tree)
                 public_url = result[0]
                 return public_url.text
             except IndexError:
@@ -658,211 +1166,187 @@ class Client(object):
             except etree.XMLSyntaxError:
                 return ""
 
-        def data(for_server):
-
-            root_node = etree.Element("propertyupdate", xmlns="DAV:")
-            set_node = etree.SubElement(root_node, "set")
-            prop_node = etree.SubElement(set_node, "prop")
-            xmlns = Client.meta_xmlns.get(for_server, "")
-            public_url = etree.SubElement(prop_node, "public_url", xmlns=xmlns)
-            public_url.text = "true"
-            tree = etree.ElementTree(root_node)
-
-            buff = BytesIO()
-            tree.write(buff)
-
-            return buff.getvalue()
-
         try:
             urn = Urn(remote_path)
 
-            if not self.check(urn.path()):
-                raise RemoteResourceNotFound(urn.path())
-
-            response = BytesIO()
+            parser = etree.XMLParser()
+            write, errors = stream_writer(parser.feed)
 
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn.quote()}
+            body = {'xmlns': quoteattr(Client.meta_xmlns.get(self.webdav.hostname, ""))}
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+                'URL': self.get_url(urn.quote()),
                 'CUSTOMREQUEST': Client.requests['publish'],
+                'ACCEPT_ENCODING': "",
                 'HTTPHEADER': self.get_header('publish'),
-                'POSTFIELDS': data(for_server=self.webdav.hostname),
-                'WRITEDATA': response,
+                'POSTFIELDS': Client.bodies['publish'].format(**body).encode('utf-8'),
+                'WRITEFUNCTION': write,
                 'NOBODY': 0
             }
 
             request = self.Request(options=options)
 
-            request.perform()
-            request.close()
+            self.perform(request, urn.path())
 
-            return parse(response)
+            return parse(parser, errors)
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
 
     def unpublish(self, remote_path):
 
-        def data(for_server):
-
-            root = etree.Element("propertyupdate", xmlns="DAV:")
-            remove = etree.SubElement(root, "remove")
-            prop = etree.SubElement(remove, "prop")
-            xmlns = Client.meta_xmlns.get(for_server, "")
-            etree.SubElement(prop, "public_url", xmlns=xmlns)
-            tree = etree.ElementTree(root)
-
-            buff = BytesIO()
-            tree.write(buff)
-
-            return buff.getvalue()
-
         try:
             urn = Urn(remote_path)
 
-            if not self.check(urn.path()):
-                raise RemoteResourceNotFound(urn.path())
-
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn.quote()}
+            body = {'xmlns': quoteattr(Client.meta_xmlns.get(self.webdav.hostname, ""))}
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+                'URL': self.get_url(urn.quote()),
                 'CUSTOMREQUEST': Client.requests['unpublish'],
                 'HTTPHEADER': self.get_header('unpublish'),
-                'POSTFIELDS': data(for_server=self.webdav.hostname)
+                'POSTFIELDS': Client.bodies['unpublish'].format(**body).encode('utf-8')
             }
 
             request = self.Request(options=options)
 
-            request.perform()
-            request.close()
+            self.perform(request, urn.path())
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
 
     def info(self, remote_path):
 
-        def parse(response, path):
+        def select(path, infos):
 
-            try:
-                response_str = response.getvalue()
-                tree = etree.fromstring(response_str)
-
-                find_attributes = {
-                    'created': ".//{DAV:}creationdate",
-                    'name': ".//{DAV:}displayname",
-                    'size': ".//{DAV:}getcontentlength",
-                    'modified': ".//{DAV:}getlastmodified"
-                }
+            def handle(resp):
+                if infos:
+                    return
+
+                href = Client.xpath['href'](resp)
+                urn = unquote(href)
 
-                resps = tree.findall("{DAV:}response")
+                if path[-1] == Urn.separate:
+                    if not path == urn:
+                        return
+                else:
+                    path_with_sep = "{path}{sep}".format(path=path, sep=Urn.separate)
+                    if not path == urn and not path_with_sep == urn:
+                        return
 
-                for resp in resps:
-                    href = resp.findtext("{DAV:}href")
-                    urn = unquote(href)
+                info = dict()
+                for name in ('created', 'name', 'size', 'modified'):
+                    values = Client.xpath[name](resp)
+                    info[name] = values[0] if values else None
+                infos.append(info)
 
-                    if path[-1] == Urn.separate:
-                        if not path == urn:
-                            continue
-                    else:
-                        path_with_sep = "{path}{sep}".format(path=path, sep=Urn.separate)
-                        if not path == urn and not path_with_sep == urn:
-                            continue
+            return handle
 
-                    info = dict()
-                    for (name, value) in find_attributes.items():
-                        info[name] = resp.findtext(value)
-                    return info
+        def parse(parser, infos, errors, path):
 
-                raise RemoteResourceNotFound(path)
+            try:
+                if errors:
+                    raise errors[0]
+                parser.close()
             except etree.XMLSyntaxError:
                 raise MethodNotSupported(name="info", server=self.webdav.hostname)
 
+            if infos:
+                return infos[0]
+            raise RemoteResourceNotFound(path)
+
         try:
             urn = Urn(remote_path)
-            response = BytesIO()
 
-            if not self.check(urn.path()) and not self.check(Urn(remote_path, directory=True).path()):
-                raise RemoteResourceNotFound(remote_path)
+            path = "{root}{path}".format(root=self.webdav.root, path=urn.path())
+            infos = list()
+            parser = etree.XMLPullParser(events=('end',), tag='{DAV:}response', huge_tree=True)
+            write, errors = stream_writer(feed_responses(parser, select(path, infos)))
 
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn.quote()}
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+                'URL': self.get_url(urn.quote()),
                 'CUSTOMREQUEST': Client.requests['info'],
+                'ACCEPT_ENCODING': "",
                 'HTTPHEADER': self.get_header('info'),
-                'WRITEDATA': response,
+                'WRITEFUNCTION': write,
                 'NOBODY': 0
             }
 
             request = self.Request(options=options)
 
-            request.perform()
-            request.close()
-
-            path = "{root}{path}".format(root=self.webdav.root, path=urn.path())
+            self.perform(request, urn.path())
 
-            return parse(response, path)
+            return parse(parser, infos, errors, path)
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
 
     def is_dir(self, remote_path):
 
-        def parse(response, path):
+        def select(path, results):
 
-            try:
-                response_str = response.getvalue()
-                tree = etree.fromstring(response_str)
+            def handle(resp):
+                href = Client.xpath['href'](resp)
+                urn = unquote(href)
+
+                types = Client.xpath['resource_type'](resp)
+                is_dir = bool(Client.xpath['collection'](types[0])) if types else None
 
-                resps = tree.findall("{DAV:}response")
+                if is_dir is not None and urn.startswith(self.webdav.root):
+                    self.remember('is_dir', urn[len(self.webdav.root):], is_dir)
 
-                for resp in resps:
-                    href = resp.findtext("{DAV:}href")
-                    urn = unquote(href)
+                if path[-1] == Urn.separate:
+                    if not path == urn:
+                        return
+                else:
+                    path_with_sep = "{path}{sep}".format(path=path, sep=Urn.separate)
+                    if not path == urn and not path_with_sep == urn:
+                        return
 
-                    if path[-1] == Urn.separate:
-                        if not path == urn:
-                            continue
-                    else:
-                        path_with_sep = "{path}{sep}".format(path=path, sep=Urn.separate)
-                        if not path == urn and not path_with_sep == urn:
-                            continue
-                    type = resp.find(".//{DAV:}resourcetype")
-                    if type is None:
-                        raise MethodNotSupported(name="is_dir", server=self.webdav.hostname)
-                    dir_type = type.find("{DAV:}collection")
+                results.append(is_dir)
 
-                    return True if dir_type is not None else False
+            return handle
 
-                raise RemoteResourceNotFound(path)
+        def parse(parser, results, errors, path):
 
+            try:
+                if errors:
+                    raise errors[0]
+                parser.close()
             except etree.XMLSyntaxError:
                 raise MethodNotSupported(name="is_dir", server=self.webdav.hostname)
 
+            if not results:
+                raise RemoteResourceNotFound(path)
+            if results[0] is None:
+                raise MethodNotSupported(name="is_dir", server=self.webdav.hostname)
+            return results[0]
+
         try:
             urn = Urn(remote_path)
+
+            entry = self.cached('is_dir', urn.path())
+            if entry:
+                return entry[1]
+
             parent_urn = Urn(urn.parent())
-            if not self.check(urn.path()) and not self.check(Urn(remote_path, directory=True).path()):
-                raise RemoteResourceNotFound(remote_path)
 
-            response = BytesIO()
+            path = "{root}{path}".format(root=self.webdav.root, path=urn.path())
+            results = list()
+            parser = etree.XMLPullParser(events=('end',), tag='{DAV:}response', huge_tree=True)
+            write, errors = stream_writer(feed_responses(parser, select(path, results)))
 
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': parent_urn.quote()}
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+                'URL': self.get_url(parent_urn.quote()),
                 'CUSTOMREQUEST': Client.requests['info'],
+                'ACCEPT_ENCODING': "",
                 'HTTPHEADER': self.get_header('info'),
-                'WRITEDATA': response,
+                'WRITEFUNCTION': write,
                 'NOBODY': 0
             }
 
             request = self.Request(options=options)
 
-            request.perform()
-            request.close()
-
-            path = "{root}{path}".format(root=self.webdav.root, path=urn.path())
+            self.perform(request, urn.path())
 
-            return parse(response, path)
+            return parse(parser, results, errors, path)
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
@@ -870,174 +1354,363 @@ class Client(object):
     def resource(self, remote_path):
 
         urn = Urn(remote_path)
-        return Resource(self, urn.path())
+        return Resource(self, urn)
 
     def get_property(self, remote_path, option):
 
-        def parse(response, option):
+        def parse(parser, errors, option):
 
-            response_str = response.getvalue()
-            tree = etree.fromstring(response_str)
-            xpath = "{xpath_prefix}{xpath_exp}".format(xpath_prefix=".//", xpath_exp=option['name'])
-            return tree.findtext(xpath)
+            if errors:
+                raise errors[0]
+            tree = parser.close()
+            tag = property_name(option).text
+            for resp in tree.iterfind("{DAV:}response"):
+                for prop in Client.xpath['propstat'](resp):
+                    return prop.findtext(tag)
+            return None
 
-        def data(option):
+        try:
+            urn = Urn(remote_path)
 
-            root = etree.Element("propfind", xmlns="DAV:")
-            prop = etree.SubElement(root, "prop")
-            etree.SubElement(prop, option.get('name', ""), xmlns=option.get('namespace', ""))
-            tree = etree.ElementTree(root)
+            parser = xml_parser.copy()
+            write, errors = stream_writer(parser.feed)
 
-            buff = BytesIO()
+            options = {
+                'URL': self.get_url(urn.quote()),
+                'CUSTOMREQUEST': Client.requests['get_metadata'],
+                'ACCEPT_ENCODING': "",
+                'HTTPHEADER': self.get_header('get_metadata'),
+                'POSTFIELDS': propfind_body([property_name(option)]),
+                'WRITEFUNCTION': write,
+                'NOBODY': 0
+            }
+
+            request = self.Request(options=options)
+
+            self.perform(request, urn.path())
+
+            return parse(parser, errors, option)
+
+        except pycurl.error:
+            raise NotConnection(self.webdav.hostname)
+
+    def get_property_batch(self, remote_path, options, recursive=False):
+
+        def select(properties):
+
+            def handle(resp):
+                urn = Urn.from_quoted(Client.xpath['href'](resp))
+                path = urn.path()
+                if path.startswith(self.webdav.root):
+                    path = path[len(self.webdav.root):]
+                values = dict.fromkeys(option['name'] for option in options)
+                collection = None
+                for prop in Client.xpath['propstat'](resp):
+                    resource_type = prop.find("{DAV:}resourcetype")
+                    if resource_type is not None:
+                        collection = resource_type.find("{DAV:}collection") is not None
+                    for (option, tag) in zip(options, tags):
+                        element = prop.find(tag)
+                        if element is not None:
+                            values[option['name']] = element.text
+                if collection is not None:
+                    path = path.rstrip(Urn.separate)
+                    if collection:
+                        path += Urn.separate
+                properties[path] = values
+
+            return handle
+
+        def parse(parser, properties, errors):
+
+            try:
+                if errors:
+                    raise errors[0]
+                parser.close()
+            except etree.XMLSyntaxError:
+                raise MethodNotSupported(name="get_property_batch", server=self.webdav.hostname)
 
-            tree.write(buff)
-            return buff.getvalue()
+            return properties
 
         try:
             urn = Urn(remote_path)
 
-            if not self.check(urn.path()):
-                raise RemoteResourceNotFound(urn.path())
+            tags = [property_name(option).text for option in options]
+            props = tags if "{DAV:}resourcetype" in tags else tags + ["{DAV:}resourcetype"]
 
-            response = BytesIO()
+            properties = dict()
+            parser = etree.XMLPullParser(events=('end',), tag='{DAV:}response', huge_tree=True)
+            write, errors = stream_writer(feed_responses(parser, select(properties)))
 
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn.quote()}
-            options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+            request_options = {
+                'URL': self.get_url(urn.quote()),
                 'CUSTOMREQUEST': Client.requests['get_metadata'],
-                'HTTPHEADER': self.get_header('get_metadata'),
-                'POSTFIELDS': data(option),
-                'WRITEDATA': response,
+                'ACCEPT_ENCODING': "",
+                'HTTPHEADER': self.get_header('get_metadata_tree' if recursive else 'get_metadata'),
+                'POSTFIELDS': propfind_body(props),
+                'WRITEFUNCTION': write,
                 'NOBODY': 0
             }
 
-            request = self.Request(options=options)
+            request = self.Request(options=request_options)
 
-            request.perform()
-            request.close()
+            code = self.perform(request, urn.path())
+            if code != 207:
+                raise MethodNotSupported(name="get_property_batch", server=self.webdav.hostname)
 
-            return parse(response, option)
+            return parse(parser, properties, errors)
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
 
     def set_property(self, remote_path, option):
 
-        def data(option):
-
-            root_node = etree.Element("propertyupdate", xmlns="DAV:")
-            root_node.set('xmlns:u', option.get('namespace', ""))
-            set_node = etree.SubElement(root_node, "set")
-            prop_node = etree.SubElement(set_node, "prop")
-            opt_node = etree.SubElement(prop_node, "{namespace}:{name}".format(namespace='u', name=option['name']))
-            opt_node.text = option.get('value', "")
+        def parse(parser, errors, path):
 
-            tree = etree.ElementTree(root_node)
-
-            buff = BytesIO()
-            tree.write(buff)
+            try:
+                if errors:
+                    raise errors[0]
+                tree = parser.close()
+            except etree.XMLSyntaxError:
+                raise MethodNotSupported(name="set_property", server=self.webdav.hostname)
 
-            return buff.getvalue()
+            for status in Client.xpath['status'](tree):
+                _, _, code = status.partition(" ")
+                self.raise_for_code(int(code[:3]), path)
 
         try:
             urn = Urn(remote_path)
 
-            if not self.check(urn.path()):
-                raise RemoteResourceNotFound(urn.path())
+            parser = xml_parser.copy()
+            write, errors = stream_writer(parser.feed)
 
-            url = {'hostname': self.webdav.hostname, 'root': self.webdav.root, 'path': urn.quote()}
             options = {
-                'URL': "{hostname}{root}{path}".format(**url),
+                'URL': self.get_url(urn.quote()),
                 'CUSTOMREQUEST': Client.requests['set_metadata'],
-                'HTTPHEADER': self.get_header('get_metadata'),
-                'POSTFIELDS': data(option)
+                'HTTPHEADER': self.get_header('set_metadata'),
+                'POSTFIELDS': proppatch_body(property_name(option), option.get('value', "")),
+                'WRITEFUNCTION': write
             }
 
             request = self.Request(options=options)
 
-            request.perform()
-            request.close()
+            if self.perform(request, urn.path()) == 207:
+                parse(parser, errors, urn.path())
 
         except pycurl.error:
             raise NotConnection(self.webdav.hostname)
 
-    def push(self, remote_directory, local_directory):
-
-        def prune(src, exp):
-            return [sub(exp, "", item) for item in src]
+    def push(self, remote_directory, local_directory, tree=None):
 
-        urn = Urn(remote_directory, directory=True)
+        remote_directory = Urn(remote_directory, directory=True).path()
 
-        if not self.is_dir(urn.path()):
+        if not self.is_dir(remote_directory):
             raise OptionNotValid(name="remote_path", value=remote_directory)
 
-        if not os.path.isdir(local_directory):
-            raise OptionNotValid(name="local_path", value=local_directory)
+        check_local_directory(local_directory)
 
-        if not os.path.exists(local_directory):
-            raise LocalResourceNotFound(local_directory)
+        if tree is None:
+            tree = self.list_tree(remote_directory)
 
-        paths = self.list(urn.path())
-        expression = "{begin}{end}".format(begin="^", end=urn.path())
-        remote_resource_names = prune(paths, expression)
+        requests = list()
+        directories = deque([(remote_directory, local_directory)])
+        while directories:
+            remote_path, local_path = directories.popleft()
 
-        for local_resource_name in listdir(local_directory):
+            remote_resource_names = tree.get(remote_path)
+            if remote_resource_names is None:
+                remote_resource_names = self.list(remote_path)
+            remote_resource_names = set(remote_resource_names)
 
-            local_path = os.path.join(local_directory, local_resource_name)
-            remote_path = "{remote_directory}{resource_name}".format(remote_directory=urn.path(), resource_name=local_resource_name)
+            files = dict()
+            with os.scandir(local_path) as entries:
+                for entry in entries:
+                    if not entry.is_dir():
+                        files[entry.name] = entry
+                        continue
+                    directory_name = "{name}{sep}".format(name=entry.name, sep=Urn.separate)
+                    directory_path = "{remote_path}{resource_name}".format(remote_path=remote_path, resource_name=directory_name)
+                    if directory_name not in remote_resource_names:
+                        self.mkdir(remote_path=directory_path)
+                        tree[directory_path] = list()
+                    directories.append((directory_path, entry.path))
 
-            if os.path.isdir(local_path):
-                if not self.check(remote_path=remote_path):
-                    self.mkdir(remote_path=remote_path)
-                self.push(remote_directory=remote_path, local_directory=local_path)
-            else:
-                if local_resource_name in remote_resource_names:
-                    continue
-                self.upload_file(remote_path=remote_path, local_path=local_path)
+            for resource_name in files.keys() - remote_resource_names:
+                entry = files[resource_name]
+                file_path = "{remote_path}{resource_name}".format(remote_path=remote_path, resource_name=resource_name)
+                requests.append(self.upload_request(remote_path=file_path, local_path=entry.path, size=entry.stat().st_size))
 
-    def pull(self, remote_directory, local_directory):
+        self.perform_multi(requests)
+        self.forget(remote_directory)
 
-        def prune(src, exp):
-            return [sub(exp, "", item) for item in src]
+    def pull(self, remote_directory, local_directory, tree=None):
 
-        urn = Urn(remote_directory, directory=True)
+        remote_directory = Urn(remote_directory, directory=True).path()
 
-        if not self.is_dir(urn.path()):
+        if not self.is_dir(remote_directory):
             raise OptionNotValid(name="remote_path", value=remote_directory)
 
-        if not os.path.exists(local_directory):
-            raise LocalResourceNotFound(local_directory)
+        check_local_directory(local_directory)
+
+        if tree is None:
+            tree = self.list_tree(remote_directory)
+
+        requests = list()
+        directories = deque([(remote_directory, local_directory)])
+        while directories:
+            remote_path, local_path = directories.popleft()
+
+            local_resource_names = set(listdir(local_path))
 
-        local_resource_names = listdir(local_directory)
+            remote_resource_names = tree.get(remote_path)
+            if remote_resource_names is None:
+                remote_resource_names = self.list(remote_path)
+            remote_resource_names = set(remote_resource_names)
 
-        paths = self.list(urn.path())
-        expression = "{begin}{end}".format(begin="^", end=remote_directory)
-        remote_resource_names = prune(paths, expression)
+            for remote_resource_name in remote_resource_names:
+                if not remote_resource_name.endswith(Urn.separate):
+                    continue
+                directory_path = os.path.join(local_path, remote_resource_name)
+                directory_name = "{name}{sep}".format(name=remote_resource_name[:-1], sep=os.path.sep)
+                if directory_name not in local_resource_names:
+                    os.mkdir(directory_path)
+                directories.append(("{remote_path}{resource_name}".format(remote_path=remote_path, resource_name=remote_resource_name), directory_path))
+
+            for remote_resource_name in remote_resource_names - local_resource_names:
+                if remote_resource_name.endswith(Urn.separate):
+                    continue
+                file_path = "{remote_path}{resource_name}".format(remote_path=remote_path, resource_name=remote_resource_name)
+                requests.append(self.download_request(remote_path=file_path, local_path=os.path.join(local_path, remote_resource_name)))
 
-        for remote_resource_name in remote_resource_names:
+        self.perform_multi(requests)
 
-            local_path = os.path.join(local_directory, remote_resource_name)
-            remote_path = "{remote_directory}{resource_name}".format(remote_directory=urn.path(), resource_name=remote_resource_name)
+    def get_metadata_tree(self, remote_path):
+
+        def modified(value):
+            try:
+                return parsedate_to_datetime(value).timestamp()
+            except (TypeError, ValueError):
+                return None
 
-            remote_urn = Urn(remote_path)
+        remote_directory = Urn(remote_path, directory=True).path()
+        options = [{'name': 'getcontentlength', 'namespace': "DAV:"}, {'name': 'getlastmodified', 'namespace': "DAV:"}]
 
-            if self.is_dir(remote_urn.path()):
-                if not os.path.exists(local_path):
-                    os.mkdir(local_path)
-                self.pull(remote_directory=remote_path, local_directory=local_path)
+        try:
+            listing = self.get_property_batch(remote_directory, options, recursive=True)
+        except (ResponseErrorCode, MethodNotSupported):
+            listing = dict()
+
+        children = [path for path in listing if path != remote_directory]
+        if remote_directory not in listing:
+            listing = dict()
+            level = [remote_directory]
+        elif any(Urn(path).parent() != remote_directory for path in children):
+            level = list()
+        else:
+            level = [path for path in children if path.endswith(Urn.separate)]
+
+        while level:
+            next_level = list()
+            for directory in level:
+                listed = self.get_property_batch(directory, options)
+                if directory not in listed:
+                    raise MethodNotSupported(name="get_metadata_tree", server=self.webdav.hostname)
+                listing.update(listed)
+                next_level.extend(path for path in listed if path != directory and path.endswith(Urn.separate))
+            level = next_level
+
+        tree = dict()
+        for (path, properties) in listing.items():
+            if not path.startswith(remote_directory) or path == remote_directory:
+                continue
+            size = properties['getcontentlength']
+            tree[path[len(remote_directory):]] = (int(size) if size else None, modified(properties['getlastmodified']))
+        return tree
+
+    def diff(self, remote_directory, local_directory):
+
+        def local_tree(directory):
+
+            tree = dict()
+            directories = [("", directory)]
+            while directories:
+                prefix, path = directories.pop()
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            name = "{prefix}{name}{sep}".format(prefix=prefix, name=entry.name, sep=Urn.separate)
+                            tree[name] = (None, None)
+                            directories.append((name, entry.path))
+                        else:
+                            stat = entry.stat()
+                            tree["{prefix}{name}".format(prefix=prefix, name=entry.name)] = (stat.st_size, stat.st_mtime)
+            return tree
+
+        remote_directory = Urn(remote_directory, directory=True).path()
+
+        check_local_directory(local_directory)
+
+        remote = self.get_metadata_tree(remote_directory)
+        local = local_tree(local_directory)
+
+        to_upload = sorted(local.keys() - remote.keys())
+        to_download = sorted(remote.keys() - local.keys())
+
+        for name in local.keys() & remote.keys():
+            if name.endswith(Urn.separate):
+                continue
+            (local_size, local_modified), (remote_size, remote_modified) = local[name], remote[name]
+            if remote_modified is None:
+                continue
+            if local_size == remote_size and abs(local_modified - remote_modified) <= self.modified_tolerance:
+                continue
+            if local_modified > remote_modified:
+                to_upload.append(name)
             else:
-                if remote_resource_name in local_resource_names:
-                    continue
-                self.download_file(remote_path=remote_path, local_path=local_path)
+                to_download.append(name)
+
+        return to_upload, to_download
 
     def sync(self, remote_directory, local_directory):
 
-        self.pull(remote_directory=remote_directory, local_directory=local_directory)
-        self.push(remote_directory=remote_directory, local_directory=local_directory)
+        remote_directory = Urn(remote_directory, directory=True).path()
+        to_upload, to_download = self.diff(remote_directory, local_directory)
+
+        requests = list()
+        transferred = list()
+        for name in sorted(to_download):
+            remote_path = "{remote_directory}{name}".format(remote_directory=remote_directory, name=name)
+            local_path = os.path.join(local_directory, *name.split(Urn.separate))
+            if name.endswith(Urn.separate):
+                os.makedirs(local_path, exist_ok=True)
+            else:
+                requests.append(self.download_request(remote_path=remote_path, local_path=local_path))
+                transferred.append((name, local_path))
+
+        for name in sorted(to_upload):
+            remote_path = "{remote_directory}{name}".format(remote_directory=remote_directory, name=name)
+            local_path = os.path.join(local_directory, *name.split(Urn.separate))
+            if name.endswith(Urn.separate):
+                self.mkdir(remote_path=remote_path)
+            else:
+                requests.append(self.upload_request(remote_path=remote_path, local_path=local_path, size=os.path.getsize(local_path)))
+                transferred.append((name, local_path))
+
+        self.perform_multi(requests)
+        self.forget(remote_directory)
+
+        if transferred:
+            remote = self.get_metadata_tree(remote_directory)
+            for (name, local_path) in transferred:
+                _, modified = remote.get(name, (None, None))
+                if modified is not None:
+                    os.utime(local_path, (modified, modified))
 
 
 class Resource(object):
 
+    __slots__ = ('client', 'urn')
+
     def __init__(self, client, urn):
         self.client = client
         self.urn = urn
@@ -1108,6 +1781,14 @@ class Resource(object):
     def unpublish(self):
         return self.client.unpublish(self.urn.path())
 
+    def properties(self, options):
+
+        path = self.urn.path().rstrip(Urn.separate)
+        for (resource_path, properties) in self.client.get_property_batch(remote_path=self.urn.path(), options=options).items():
+            if resource_path.rstrip(Urn.separate) == path:
+                return properties
+        raise RemoteResourceNotFound(self.urn.path())
+
     @property
     def property(self, option):
         return self.client.get_property(remote_path=self.urn.path(), option=option)
@@ -57,6 +57,15 @@ class MethodNotSupported(WebDavException):
         return "Method {name} not supported for {server}".format(name=self.name, server=self.server)
 
 
+class ResponseErrorCode(WebDavException):
+    def __init__(self, path, code):
+        self.path = path
+        self.code = code
+
+    def __str__(self):
+        return "Request for {path} failed with code {code}".format(path=self.path, code=self.code)
+
+
 class NotConnection(WebDavException):
     def __init__(self, hostname):
         self.hostname = hostname
@@ -1,27 +1,41 @@
-try:
-    from urllib.parse import unquote, quote
-except ImportError:
-    from urllib import unquote, quote
+from urllib.parse import unquote, quote
 
-from re import sub
+from functools import lru_cache
+from re import compile
 
 
 class Urn(object):
 
+    __slots__ = ('_path',)
+
     separate = "/"
+    expressions = compile(r"/\.+/"), compile(r"/+")
 
     def __init__(self, path, directory=False):
+        self._path = Urn.normalize(path, directory)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def normalize(path, directory):
+
+        path = quote(path)
+        for expression in Urn.expressions:
+            path = expression.sub(Urn.separate, path)
 
-        self._path = quote(path)
-        expressions = "/\.+/", "/+"
-        for expression in expressions:
-            self._path = sub(expression, Urn.separate, self._path)
+        if path[:1] != Urn.separate:
+            path = Urn.separate + path
 
-        if not self._path.startswith(Urn.separate):
-            self._path = "{begin}{end}".format(begin=Urn.separate, end=self._path)
+        if directory and path[-1] != Urn.separate:
+            path += Urn.separate
 
-        if directory and not self._path.endswith(Urn.separate):
-            self._path = "{begin}{end}".format(begin=self._path, end=Urn.separate)
+        return path
+
+    @classmethod
+    def from_quoted(cls, path):
+
+        urn = cls.__new__(cls)
+        urn._path = path
+        return urn
 
     def __str__(self):
         return self.path()
@@ -34,20 +48,17 @@ class Urn(object):
 
     def filename(self):
 
-        path_split = self._path.split(Urn.separate)
-        name = path_split[-2] + Urn.separate if path_split[-1] == '' else path_split[-1]
+        if self.is_dir():
+            _, _, name = self._path[:-1].rpartition(Urn.separate)
+            return unquote(name + Urn.separate)
+
+        _, _, name = self._path.rpartition(Urn.separate)
         return unquote(name)
 
     def parent(self):
 
-        path_split = self._path.split(Urn.separate)
-        nesting_level = self.nesting_level()
-        parent_path_split = path_split[:nesting_level]
-        parent = self.separate.join(parent_path_split) if nesting_level != 1 else Urn.separate
-        if not parent.endswith(Urn.separate):
-            return unquote(parent + Urn.separate)
-        else:
-            return unquote(parent)
+        parent, _, _ = self._path.rstrip(Urn.separate).rpartition(Urn.separate)
+        return unquote(parent + Urn.separate)
 
     def nesting_level(self):
         return self._path.count(Urn.separate, 0, -1)